@@ -1,83 +1,29 @@
 import azure.functions as func
-from azure.storage.blob import BlobServiceClient
-import PyPDF2
-import io
-import uuid
 import json
-import os
-import datetime
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery
-from openai import AzureOpenAI
 import logging
+import os
+from rag_core import (
+    build_chunk_documents,
+    build_citations,
+    candidates_from_env,
+    delete_existing_chunks,
+    encode_json,
+    extract_text,
+    generate_answer,
+    get_blob_service_client,
+    get_openai_client,
+    get_search_client,
+    hot_set_from_env,
+    search_documents,
+)
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
-# Initialize clients (these will use environment variables)
-def get_search_client():
-    search_endpoint = os.environ["SEARCH_ENDPOINT"]
-    search_key = os.environ["SEARCH_ADMIN_KEY"]
-    return SearchClient(search_endpoint, "documents-index", AzureKeyCredential(search_key))
-
-def get_openai_client():
-    return AzureOpenAI(
-        api_key=os.environ["OPENAI_API_KEY"],
-        api_version="2024-02-15-preview",
-        azure_endpoint=os.environ["OPENAI_ENDPOINT"]
-    )
-
-def get_embedding(text: str, openai_client):
-    response = openai_client.embeddings.create(
-        input=text,
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
-
-def search_documents(query: str, search_client, openai_client, top_k: int = 3):
-    query_vector = get_embedding(query, openai_client)
-    
-    vector_query = VectorizedQuery(
-        vector=query_vector,
-        k_nearest_neighbors=top_k,
-        fields="contentVector"
-    )
-    
-    results = search_client.search(
-        search_text=query,
-        vector_queries=[vector_query],
-        select=["content", "title", "metadata_storage_name"],
-        top=top_k
-    )
-    
-    return list(results)
-
-def generate_answer(query: str, context_docs: list, openai_client):
-    context = "\n\n".join([
-        f"[Source: {doc.get('metadata_storage_name', doc.get('title', 'Unknown'))}]\n{doc['content']}"
-        for doc in context_docs
-    ])
-    
-    messages = [
-        {"role": "system", "content": "You are a helpful assistant that answers questions based on provided context and always cites sources using [Source: filename]."},
-        {"role": "user", "content": f"""Answer the question based on the context provided.
+# Per-instance cache of hot chunks; refreshed in the background, invalidated by /reindex
+hot_set = hot_set_from_env()
 
-Context:
-{context}
-
-Question: {query}
-
-Answer:"""}
-    ]
-    
-    response = openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        temperature=0.7,
-        max_tokens=500
-    )
-    
-    return response.choices[0].message.content
+# Search hits over-fetched per query for local reranking
+rerank_candidates = candidates_from_env()
 
 # Common CORS headers to return on responses
 DEFAULT_CORS_HEADERS = {
@@ -104,6 +50,16 @@ def health(req: func.HttpRequest) -> func.HttpResponse:
         headers=DEFAULT_CORS_HEADERS
     )
 
+@app.route(route="metrics", methods=["GET"])
+def metrics(req: func.HttpRequest) -> func.HttpResponse:
+    body = json.dumps({"hot_set": hot_set.metrics() if hot_set is not None else None})
+    return func.HttpResponse(
+        body,
+        mimetype="application/json",
+        status_code=200,
+        headers=DEFAULT_CORS_HEADERS
+    )
+
 @app.route(route="query", methods=["POST"])
 def query(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Query endpoint hit.')
@@ -126,30 +82,24 @@ def query(req: func.HttpRequest) -> func.HttpResponse:
         openai_client = get_openai_client()
         
         # Search documents
-        search_results = search_documents(user_query, search_client, openai_client)
+        if hot_set is not None:
+            hot_set.start(get_search_client)
+        search_results = search_documents(user_query, search_client, openai_client, candidates=rerank_candidates, hot_set=hot_set)
         
         # Generate answer
         answer = generate_answer(user_query, search_results, openai_client)
         
-        # Prepare citations
-        citations = [
-            {
-                "source": doc.get('metadata_storage_name', doc.get('title', 'Unknown')),
-                "content": doc['content'][:200] + "..."
-            }
-            for doc in search_results
-        ]
-        
         response = {
             "answer": answer,
-            "citations": citations
+            "citations": build_citations(search_results)
         }
 
+        body, encoding_headers = encode_json(response, req.headers.get("Accept-Encoding", ""))
         return func.HttpResponse(
-            json.dumps(response),
+            body,
             mimetype="application/json",
             status_code=200,
-            headers=DEFAULT_CORS_HEADERS
+            headers={**DEFAULT_CORS_HEADERS, **encoding_headers}
         )
     
     except Exception as e:
@@ -164,75 +114,26 @@ def query(req: func.HttpRequest) -> func.HttpResponse:
     
 # ─── Reindexing helpers ───────────────────────────────────────────
 
-def extract_text_from_pdf(blob_data: bytes) -> str:
-    pdf_reader = PyPDF2.PdfReader(io.BytesIO(blob_data))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start = end - overlap
-    return chunks
-
-def make_safe_id(blob_name: str, chunk_index: int) -> str:
-    safe_name = blob_name.replace('.', '_').replace(' ', '_')
-    return f"{safe_name}_{chunk_index}"
-
-def delete_existing_chunks(search_client, blob_name: str):
-    """Delete all existing chunks for a document before reindexing"""
-    safe_name = blob_name.replace('.', '_').replace(' ', '_')
-    results = search_client.search(
-        search_text="*",
-        filter=f"metadata_storage_name eq '{blob_name}'",
-        select=["id"]
-    )
-    ids_to_delete = [{"id": doc["id"]} for doc in results]
-    if ids_to_delete:
-        search_client.delete_documents(documents=ids_to_delete)
-        logging.info(f"Deleted {len(ids_to_delete)} old chunks for {blob_name}")
-
 def reindex_document(blob_name: str):
     """Process a single blob and reindex it"""
     openai_client = get_openai_client()
     search_client = get_search_client()
 
     # Connect to Blob Storage
-    storage_connection = os.environ["STORAGE_CONNECTION_STRING"]
     container_name = os.environ.get("CONTAINER_NAME", "documents")
-    blob_service = BlobServiceClient.from_connection_string(storage_connection)
+    blob_service = get_blob_service_client()
     container_client = blob_service.get_container_client(container_name)
     blob_client = container_client.get_blob_client(blob_name)
 
     # Download and extract text
     blob_data = blob_client.download_blob().readall()
-    if blob_name.endswith('.pdf'):
-        text = extract_text_from_pdf(blob_data)
-    else:
-        text = blob_data.decode('utf-8')
-
-    # Chunk text
-    chunks = chunk_text(text)
+    text = extract_text(blob_name, blob_data)
 
     # Delete old chunks
     delete_existing_chunks(search_client, blob_name)
 
     # Generate embeddings and index new chunks
-    documents = []
-    for i, chunk in enumerate(chunks):
-        embedding = get_embedding(chunk, openai_client)
-        documents.append({
-            "id": make_safe_id(blob_name, i),
-            "content": chunk,
-            "title": blob_name,
-            "metadata_storage_name": blob_name,
-            "contentVector": embedding
-        })
+    documents = build_chunk_documents(blob_name, text, openai_client)
 
     search_client.upload_documents(documents)
     logging.info(f"✅ Reindexed {len(documents)} chunks from {blob_name}")
@@ -286,11 +187,15 @@ def reindex(req: func.HttpRequest) -> func.HttpResponse:
                 if event["eventType"] == "Microsoft.Storage.BlobDeleted":
                     search_client = get_search_client()
                     delete_existing_chunks(search_client, blob_name)
+                    if hot_set is not None:
+                        hot_set.invalidate(blob_name, forget=True)
                     logging.info(f"Deleted chunks for {blob_name}")
                     continue
 
                 # Reindex the document
                 reindex_document(blob_name)
+                if hot_set is not None:
+                    hot_set.invalidate(blob_name)
 
         return func.HttpResponse(
             json.dumps({"message": "Reindexing complete"}),
@@ -0,0 +1,55 @@
+"""Shared RAG pipeline used by the Function app, the FastAPI backend and the ingestion scripts.
+
+Every function takes its clients as arguments, so callers can pass the real
+Azure clients or any object with the same interface. Heavy SDKs (Azure
+Search, OpenAI, Blob Storage, PyPDF2) are only imported by the functions that
+use them, keeping the query-only cold start small.
+"""
+
+from rag_core.clients import (
+    get_blob_service_client,
+    get_openai_client,
+    get_search_client,
+)
+from rag_core.hotset import HotSetIndex, hot_set_from_env
+from rag_core.ingest import (
+    build_chunk_documents,
+    chunk_text,
+    delete_existing_chunks,
+    extract_text,
+    extract_text_from_pdf,
+    make_safe_id,
+)
+from rag_core.pipeline import (
+    build_citations,
+    candidates_from_env,
+    doc_source,
+    generate_answer,
+    get_embedding,
+    search_documents,
+)
+from rag_core.rerank import rerank
+from rag_core.responses import dumps, encode_json
+
+__all__ = [
+    "HotSetIndex",
+    "build_chunk_documents",
+    "build_citations",
+    "candidates_from_env",
+    "chunk_text",
+    "delete_existing_chunks",
+    "doc_source",
+    "dumps",
+    "encode_json",
+    "extract_text",
+    "extract_text_from_pdf",
+    "generate_answer",
+    "get_blob_service_client",
+    "get_embedding",
+    "get_openai_client",
+    "get_search_client",
+    "hot_set_from_env",
+    "make_safe_id",
+    "rerank",
+    "search_documents",
+]
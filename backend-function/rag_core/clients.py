@@ -0,0 +1,31 @@
+import os
+
+INDEX_NAME = "documents-index"
+OPENAI_API_VERSION = "2024-02-15-preview"
+
+
+# Initialize clients (these will use environment variables).
+# SDK imports live inside each factory so importing this module stays cheap.
+def get_search_client(index_name: str = INDEX_NAME):
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+
+    search_endpoint = os.environ["SEARCH_ENDPOINT"]
+    search_key = os.environ["SEARCH_ADMIN_KEY"]
+    return SearchClient(search_endpoint, index_name, AzureKeyCredential(search_key))
+
+
+def get_openai_client():
+    from openai import AzureOpenAI
+
+    return AzureOpenAI(
+        api_key=os.environ["OPENAI_API_KEY"],
+        api_version=OPENAI_API_VERSION,
+        azure_endpoint=os.environ["OPENAI_ENDPOINT"]
+    )
+
+
+def get_blob_service_client():
+    from azure.storage.blob import BlobServiceClient
+
+    return BlobServiceClient.from_connection_string(os.environ["STORAGE_CONNECTION_STRING"])
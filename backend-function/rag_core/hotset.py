@@ -0,0 +1,243 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from rag_core.rerank import SELECT_FIELDS, VECTOR_FIELD
+
+# Ids per search.in filter when refreshing
+REFRESH_BATCH = 100
+TERM_PATTERN = re.compile(r"\w+")
+
+
+class HotSetIndex:
+    """In-process index of the most-cited chunks, checked before the remote search.
+
+    Citation counts are recorded for every answered query and halved on each
+    refresh, so chunks that stop being cited age out. A background thread
+    periodically reloads the `capacity` most-cited chunks and their vectors into
+    one contiguous, L2-normalised float32 matrix. A query is answered locally
+    when its k-th best cosine score reaches `threshold`; its local candidates
+    are then reranked like remote ones. Otherwise it falls through to the
+    remote hybrid search.
+
+    The index is per process. `invalidate` only drops a reindexed or deleted
+    blob from the instance that handled the change; every other instance keeps
+    serving its old chunks until its next refresh, so results can be up to
+    `refresh_seconds` stale.
+    """
+
+    def __init__(self, capacity: int = 500, threshold: float = 0.9, refresh_seconds: float = 300):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._citations = Counter()
+        self._blobs = {}
+        self._matrix = None
+        self._docs = []
+        self._refreshing = False
+        self._stale_blobs = set()
+        self._thread = None
+        self._stop = threading.Event()
+        self._metrics = Counter()
+        self._remote_ms = None
+        self._last_refresh = None
+
+    # ─── Query path ───────────────────────────────────────────────
+
+    def lookup(self, query_vector, top_k: int = 3, candidates: int = None, query: str = ""):
+        """Return up to `candidates` local hits, vectors included, if confident enough, else None.
+
+        The hits go through the same rerank as remote results: vectors are the
+        stored matrix rows and `@search.score` is the share of query terms found
+        in the chunk, standing in for the keyword side of hybrid search.
+        """
+        import numpy as np
+
+        start = time.perf_counter()
+        with self._lock:
+            matrix, docs = self._matrix, self._docs
+            self._metrics["lookups"] += 1
+
+        results = None
+        if matrix is not None and len(docs) >= top_k:
+            fetch = min(len(docs), max(top_k, candidates or top_k))
+            vector = np.asarray(query_vector, dtype=np.float32)
+            scores = matrix @ (vector / (np.linalg.norm(vector) + 1e-12))
+            best = np.argpartition(scores, -fetch)[-fetch:]
+            best = best[np.argsort(scores[best])[::-1]]
+            if scores[best[top_k - 1]] >= self.threshold:
+                terms = set(TERM_PATTERN.findall(query.lower()))
+                results = [
+                    {**docs[i], VECTOR_FIELD: matrix[i], "@search.score": _term_overlap(terms, docs[i].get("content"))}
+                    for i in best
+                ]
+
+        lookup_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            if results is None:
+                self._metrics["misses"] += 1
+            else:
+                self._metrics["hits"] += 1
+                self._metrics["local_ms_total"] += lookup_ms
+                if self._remote_ms is not None:
+                    self._metrics["saved_ms_total"] += max(0.0, self._remote_ms - lookup_ms)
+        return results
+
+    def record(self, docs: list, remote_seconds: float = None):
+        """Count citations, and track remote search latency for the saved-time metric"""
+        with self._lock:
+            for doc in docs:
+                if doc.get("id"):
+                    self._citations[doc["id"]] += 1
+                    self._blobs[doc["id"]] = doc.get("metadata_storage_name")
+            if remote_seconds is not None:
+                remote_ms = remote_seconds * 1000
+                # Exponentially weighted so the estimate follows the service
+                self._remote_ms = remote_ms if self._remote_ms is None else 0.9 * self._remote_ms + 0.1 * remote_ms
+
+    # ─── Maintenance ──────────────────────────────────────────────
+
+    def refresh(self, search_client):
+        """Reload the most-cited chunks and their vectors from the search index"""
+        import numpy as np
+
+        with self._lock:
+            hot_ids = [doc_id for doc_id, _ in self._citations.most_common(self.capacity)]
+            self._decay_citations()
+            self._refreshing = True
+            self._stale_blobs.clear()
+
+        try:
+            docs = []
+            for i in range(0, len(hot_ids), REFRESH_BATCH):
+                batch = hot_ids[i:i + REFRESH_BATCH]
+                docs.extend(search_client.search(
+                    search_text="*",
+                    filter=f"search.in(id, '{','.join(batch)}', ',')",
+                    select=SELECT_FIELDS,
+                    top=len(batch)
+                ))
+        except Exception:
+            with self._lock:
+                self._refreshing = False
+            raise
+
+        with self._lock:
+            self._refreshing = False
+            # Chunks that no longer exist stop being tracked
+            found = {doc["id"] for doc in docs}
+            for doc_id in set(hot_ids) - found:
+                self._citations.pop(doc_id, None)
+                self._blobs.pop(doc_id, None)
+            # Blobs reindexed while we were fetching may have come back stale
+            docs = [doc for doc in docs if doc.get(VECTOR_FIELD) and doc.get("metadata_storage_name") not in self._stale_blobs]
+            if docs:
+                matrix = np.ascontiguousarray([doc[VECTOR_FIELD] for doc in docs], dtype=np.float32)
+                matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            else:
+                matrix = None
+            self._matrix = matrix
+            self._docs = [{key: doc.get(key) for key in SELECT_FIELDS if key != VECTOR_FIELD} for doc in docs]
+            self._metrics["refreshes"] += 1
+            self._last_refresh = time.time()
+        logging.info(f"Hot set refreshed with {len(docs)} chunks")
+
+    def _decay_citations(self):
+        # Halve every count so the hot set follows recent traffic; caller holds the lock
+        for doc_id, count in list(self._citations.items()):
+            if count // 2:
+                self._citations[doc_id] = count // 2
+            else:
+                del self._citations[doc_id]
+                self._blobs.pop(doc_id, None)
+
+    def invalidate(self, blob_name: str, forget: bool = False):
+        """Drop a blob's chunks now; with forget=True also drop their citation counts"""
+        import numpy as np
+
+        with self._lock:
+            if self._refreshing:
+                self._stale_blobs.add(blob_name)
+            keep = [i for i, doc in enumerate(self._docs) if doc.get("metadata_storage_name") != blob_name]
+            if len(keep) != len(self._docs):
+                self._docs = [self._docs[i] for i in keep]
+                self._matrix = np.ascontiguousarray(self._matrix[keep]) if keep else None
+            if forget:
+                for doc_id in [d for d, blob in self._blobs.items() if blob == blob_name]:
+                    self._citations.pop(doc_id, None)
+                    self._blobs.pop(doc_id, None)
+            self._metrics["invalidations"] += 1
+
+    def start(self, search_client_factory):
+        """Start the background refresh thread once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._refresh_loop, args=(search_client_factory,), name="hot-set-refresh", daemon=True
+            )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self, search_client_factory):
+        search_client = search_client_factory()
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh(search_client)
+            except Exception as e:
+                logging.error(f"Hot set refresh failed: {str(e)}")
+
+    def reset_metrics(self):
+        """Zero the counters, e.g. after warmup; the cached chunks and latency estimate stay"""
+        with self._lock:
+            self._metrics.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            m = dict(self._metrics)
+            lookups = m.get("lookups", 0)
+            hits = m.get("hits", 0)
+            return {
+                "size": len(self._docs),
+                "tracked_chunks": len(self._citations),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "lookups": lookups,
+                "hits": hits,
+                "misses": m.get("misses", 0),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "saved_ms_total": round(m.get("saved_ms_total", 0.0), 1),
+                "local_lookup_ms_avg": round(m.get("local_ms_total", 0.0) / hits, 3) if hits else 0.0,
+                "remote_search_ms_ewma": round(self._remote_ms, 1) if self._remote_ms is not None else None,
+                "refreshes": m.get("refreshes", 0),
+                "invalidations": m.get("invalidations", 0),
+                "last_refresh": self._last_refresh,
+                # invalidate() only reaches this instance; others catch up on refresh
+                "scope": "per-instance",
+                "max_staleness_seconds": self.refresh_seconds,
+                "seconds_since_refresh": round(time.time() - self._last_refresh, 1) if self._last_refresh else None,
+            }
+
+
+def _term_overlap(terms: set, content) -> float:
+    if not terms or not content:
+        return 0.0
+    return len(terms.intersection(TERM_PATTERN.findall(content.lower()))) / len(terms)
+
+
+def hot_set_from_env():
+    """Build a HotSetIndex from HOTSET_* settings; off unless HOTSET_CAPACITY > 0"""
+    capacity = int(os.environ.get("HOTSET_CAPACITY", "0"))
+    if capacity <= 0:
+        return None
+    return HotSetIndex(
+        capacity=capacity,
+        threshold=float(os.environ.get("HOTSET_THRESHOLD", "0.9")),
+        refresh_seconds=float(os.environ.get("HOTSET_REFRESH_SECONDS", "300")),
+    )
@@ -0,0 +1,65 @@
+import logging
+
+from rag_core.pipeline import get_embedding
+
+
+def extract_text_from_pdf(blob_data: bytes) -> str:
+    # PyPDF2 is only needed for ingestion, never on the query path
+    import io
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(blob_data))
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text()
+    return text
+
+
+def extract_text(blob_name: str, blob_data: bytes) -> str:
+    if blob_name.endswith('.pdf'):
+        return extract_text_from_pdf(blob_data)
+    return blob_data.decode('utf-8')
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100):
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        chunks.append(text[start:end])
+        start = end - overlap
+    return chunks
+
+
+def make_safe_id(blob_name: str, chunk_index: int) -> str:
+    """Create a safe document ID"""
+    safe_name = blob_name.replace('.', '_').replace(' ', '_')
+    return f"{safe_name}_{chunk_index}"
+
+
+def build_chunk_documents(blob_name: str, text: str, openai_client, **extra_fields):
+    """Chunk text and embed each chunk into an index-ready document"""
+    documents = []
+    for i, chunk in enumerate(chunk_text(text)):
+        documents.append({
+            "id": make_safe_id(blob_name, i),
+            "content": chunk,
+            "title": blob_name,
+            "metadata_storage_name": blob_name,
+            **extra_fields,
+            "contentVector": get_embedding(chunk, openai_client)
+        })
+    return documents
+
+
+def delete_existing_chunks(search_client, blob_name: str):
+    """Delete all existing chunks for a document before reindexing"""
+    results = search_client.search(
+        search_text="*",
+        filter=f"metadata_storage_name eq '{blob_name}'",
+        select=["id"]
+    )
+    ids_to_delete = [{"id": doc["id"]} for doc in results]
+    if ids_to_delete:
+        search_client.delete_documents(documents=ids_to_delete)
+        logging.info(f"Deleted {len(ids_to_delete)} old chunks for {blob_name}")
@@ -0,0 +1,121 @@
+import os
+import time
+
+from rag_core.rerank import SELECT_FIELDS, VECTOR_FIELD, rerank
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+CHAT_MODEL = "gpt-4o"
+
+CITATION_CHARS = 200
+
+# Hybrid-search hits fetched per query for local reranking. Every candidate
+# carries a 1536-float vector (~10 KB of JSON), so this trades response size
+# and latency for relevance. Off (= top_k) until the bench's source_hit_rate
+# shows a gain worth that cost.
+DEFAULT_CANDIDATES = 3
+
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions based on provided context and always cites sources using [Source: filename]."
+
+
+def doc_source(doc) -> str:
+    return doc.get('metadata_storage_name', doc.get('title', 'Unknown'))
+
+
+def get_embedding(text: str, openai_client):
+    response = openai_client.embeddings.create(
+        input=text,
+        model=EMBEDDING_MODEL
+    )
+    return response.data[0].embedding
+
+
+def candidates_from_env() -> int:
+    """RERANK_CANDIDATES setting; a value <= top_k turns over-fetch and rerank off"""
+    return int(os.environ.get("RERANK_CANDIDATES", DEFAULT_CANDIDATES))
+
+
+def search_documents(query: str, search_client, openai_client, top_k: int = 3, candidates: int = DEFAULT_CANDIDATES, hot_set=None):
+    """Over-fetch `candidates` hits with their vectors and rerank them locally down to top_k.
+
+    With candidates <= top_k, fetches exactly top_k hits without vectors.
+    With a HotSetIndex, confident local matches skip the remote search and are
+    reranked the same way.
+    """
+    from azure.search.documents.models import VectorizedQuery
+
+    query_vector = get_embedding(query, openai_client)
+
+    if hot_set is not None:
+        local_docs = hot_set.lookup(query_vector, top_k, candidates, query)
+        if local_docs is not None:
+            docs = rerank(query_vector, local_docs, top_k)
+            hot_set.record(docs)
+            return docs
+
+    start = time.perf_counter()
+    over_fetch = candidates > top_k
+    fetch = candidates if over_fetch else top_k
+    select = SELECT_FIELDS if over_fetch else [f for f in SELECT_FIELDS if f != VECTOR_FIELD]
+
+    vector_query = VectorizedQuery(
+        vector=query_vector,
+        k_nearest_neighbors=fetch,
+        fields=VECTOR_FIELD
+    )
+
+    # Highlights give ready-made citation snippets centred on the matched terms
+    results = search_client.search(
+        search_text=query,
+        vector_queries=[vector_query],
+        select=select,
+        highlight_fields="content",
+        highlight_pre_tag="",
+        highlight_post_tag="",
+        top=fetch
+    )
+
+    docs = rerank(query_vector, list(results), top_k) if over_fetch else list(results)[:top_k]
+    if hot_set is not None:
+        hot_set.record(docs, time.perf_counter() - start)
+    return docs
+
+
+def generate_answer(query: str, context_docs: list, openai_client):
+    context = "\n\n".join([
+        f"[Source: {doc_source(doc)}]\n{doc['content']}"
+        for doc in context_docs
+    ])
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"""Answer the question based on the context provided.
+
+Context:
+{context}
+
+Question: {query}
+
+Answer:"""}
+    ]
+
+    response = openai_client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=0.7,
+        max_tokens=500
+    )
+
+    return response.choices[0].message.content
+
+
+def build_citations(docs: list) -> list:
+    """Compact {source, content} citations, preferring the search highlight as snippet"""
+    citations = []
+    for doc in docs:
+        highlights = (doc.get("@search.highlights") or {}).get("content")
+        snippet = highlights[0] if highlights else doc['content']
+        citations.append({
+            "source": doc_source(doc),
+            "content": snippet[:CITATION_CHARS] + "..."
+        })
+    return citations
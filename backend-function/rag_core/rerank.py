@@ -0,0 +1,58 @@
+VECTOR_FIELD = "contentVector"
+# Fields every retrieved chunk carries, whether it comes from the search index
+# or the hot set: what generate_answer and the citations read, ids for the hot
+# set's citation counts, and vectors for reranking
+SELECT_FIELDS = ["id", "content", "metadata_storage_name", VECTOR_FIELD]
+
+
+def rerank(query_vector, candidates: list, top_k: int = 3, diversity: float = 0.3, keyword_weight: float = 0.3):
+    """Pick the best top_k candidates by cosine relevance plus MMR diversity.
+
+    Relevance blends cosine similarity to the query vector with the search
+    score (which carries the keyword side of hybrid search). Maximal Marginal
+    Relevance then penalises chunks that repeat what is already selected.
+    Candidates without a vector only compete on search score. Vectors are
+    stripped from the returned documents.
+    """
+    import numpy as np
+
+    dimensions = next((len(doc[VECTOR_FIELD]) for doc in candidates if _has_vector(doc)), 0)
+    if len(candidates) <= top_k or not dimensions:
+        return [_without_vector(doc) for doc in candidates[:top_k]]
+
+    vectors = np.zeros((len(candidates), dimensions), dtype=np.float32)
+    for i, doc in enumerate(candidates):
+        if _has_vector(doc):
+            vectors[i] = doc[VECTOR_FIELD]
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    # np.array copies, so a caller's float32 vector is never normalised in place
+    query = np.array(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) + 1e-12
+
+    relevance = vectors @ query
+    scores = np.asarray([doc.get("@search.score") or 0.0 for doc in candidates], dtype=np.float32)
+    if scores.max() > 0:
+        relevance = (1 - keyword_weight) * relevance + keyword_weight * (scores / scores.max())
+
+    similarity = vectors @ vectors.T
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything already selected
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < top_k:
+        mmr = (1 - diversity) * relevance - diversity * redundancy
+        mmr[selected] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return [_without_vector(candidates[i]) for i in selected]
+
+
+def _has_vector(doc) -> bool:
+    # Lists from the search service or NumPy rows from the hot set
+    vector = doc.get(VECTOR_FIELD)
+    return vector is not None and len(vector) > 0
+
+
+def _without_vector(doc):
+    return {key: value for key, value in doc.items() if key != VECTOR_FIELD}
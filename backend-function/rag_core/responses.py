@@ -0,0 +1,70 @@
+import functools
+import gzip
+import json
+import time
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_BYTES = 512
+
+
+# Optional encoders are imported on first use, so importing rag_core (e.g. for
+# ingestion) does not load them; the cache avoids retrying a failed import
+@functools.lru_cache(maxsize=None)
+def _orjson():
+    try:
+        import orjson
+    except ImportError:  # plain json keeps working, just slower
+        return None
+    return orjson
+
+
+@functools.lru_cache(maxsize=None)
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def dumps(payload) -> bytes:
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def encode_json(payload, accept_encoding: str = ""):
+    """Serialize payload and compress it for the client.
+
+    Returns (body, headers). Brotli is preferred when installed and accepted,
+    then gzip. The Server-Timing header reports serialization and compression
+    time separately, in milliseconds.
+    """
+    start = time.perf_counter()
+    body = dumps(payload)
+    serialized = time.perf_counter()
+    headers = {"Vary": "Accept-Encoding"}
+
+    if len(body) >= MIN_COMPRESS_BYTES and accept_encoding:
+        brotli = _brotli() if _accepts(accept_encoding, "br") else None
+        if brotli is not None:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif _accepts(accept_encoding, "gzip"):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+    end = time.perf_counter()
+    headers["Server-Timing"] = (
+        f"serialize;dur={(serialized - start) * 1000:.3f}, compress;dur={(end - serialized) * 1000:.3f}"
+    )
+    return body, headers
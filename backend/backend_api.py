@@ -1,12 +1,23 @@
 import os
+import sys
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery
-from openai import AzureOpenAI
+
+# The shared RAG package ships with the Function app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-function"))
+
+from rag_core import (
+    build_citations,
+    candidates_from_env,
+    encode_json,
+    generate_answer,
+    get_openai_client,
+    get_search_client,
+    hot_set_from_env,
+    search_documents,
+)
 
 load_dotenv()
 
@@ -22,15 +33,16 @@ app.add_middleware(
 )
 
 # Initialize clients
-search_endpoint = os.getenv("SEARCH_ENDPOINT")
-search_key = os.getenv("SEARCH_ADMIN_KEY")
-search_client = SearchClient(search_endpoint, "documents-index", AzureKeyCredential(search_key))
-
-openai_client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    api_version="2024-02-15-preview",
-    azure_endpoint=os.getenv("OPENAI_ENDPOINT")
-)
+search_client = get_search_client()
+openai_client = get_openai_client()
+
+# Local cache of hot chunks, refreshed in the background
+hot_set = hot_set_from_env()
+
+# Search hits over-fetched per query for local reranking
+rerank_candidates = candidates_from_env()
+if hot_set is not None:
+    hot_set.start(lambda: search_client)
 
 class QueryRequest(BaseModel):
     query: str
@@ -43,58 +55,6 @@ class QueryResponse(BaseModel):
     answer: str
     citations: list[Citation]
 
-def get_embedding(text: str):
-    response = openai_client.embeddings.create(
-        input=text,
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
-
-def search_documents(query: str, top_k: int = 3):
-    query_vector = get_embedding(query)
-    
-    vector_query = VectorizedQuery(
-        vector=query_vector,
-        k_nearest_neighbors=top_k,
-        fields="contentVector"
-    )
-    
-    results = search_client.search(
-        search_text=query,
-        vector_queries=[vector_query],
-        select=["content", "title", "metadata_storage_name"],
-        top=top_k
-    )
-    
-    return list(results)
-
-def generate_answer(query: str, context_docs: list):
-    context = "\n\n".join([
-        f"[Source: {doc.get('metadata_storage_name', doc.get('title', 'Unknown'))}]\n{doc['content']}"
-        for doc in context_docs
-    ])
-    
-    messages = [
-        {"role": "system", "content": "You are a helpful assistant that answers questions based on provided context and always cites sources using [Source: filename]."},
-        {"role": "user", "content": f"""Answer the question based on the context provided.
-
-Context:
-{context}
-
-Question: {query}
-
-Answer:"""}
-    ]
-    
-    response = openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        temperature=0.7,
-        max_tokens=500
-    )
-    
-    return response.choices[0].message.content
-
 @app.get("/")
 async def root():
     return {"message": "RAG API is running"}
@@ -103,28 +63,28 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {"hot_set": hot_set.metrics() if hot_set is not None else None}
+
 @app.post("/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+async def query(request: QueryRequest, http_request: Request):
     if not request.query:
         raise HTTPException(status_code=400, detail="No query provided")
     
     try:
         # Search documents
-        search_results = search_documents(request.query)
+        search_results = search_documents(request.query, search_client, openai_client, candidates=rerank_candidates, hot_set=hot_set)
         
         # Generate answer
-        answer = generate_answer(request.query, search_results)
-        
-        # Prepare citations
-        citations = [
-            Citation(
-                source=doc.get('metadata_storage_name', doc.get('title', 'Unknown')),
-                content=doc['content'][:200] + "..."
-            )
-            for doc in search_results
-        ]
+        answer = generate_answer(request.query, search_results, openai_client)
         
-        return QueryResponse(answer=answer, citations=citations)
+        # Serialize and compress directly; the payload already matches QueryResponse
+        body, headers = encode_json(
+            {"answer": answer, "citations": build_citations(search_results)},
+            http_request.headers.get("accept-encoding", "")
+        )
+        return Response(content=body, media_type="application/json", headers=headers)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,15 @@
+"""Offline load-testing and benchmark suite for the RAG pipeline.
+
+Everything here runs against local stand-ins for Azure AI Search, Azure OpenAI
+and Blob Storage, so results are comparable between commits without any
+Azure resources. See ``python -m bench.run_bench --help``.
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTION_DIR = os.path.join(ROOT_DIR, "backend-function")
+
+# The shared RAG package ships with the Function app
+if FUNCTION_DIR not in sys.path:
+    sys.path.insert(0, FUNCTION_DIR)
@@ -0,0 +1,71 @@
+"""Filesystem stand-in for azure.storage.blob.BlobServiceClient.
+
+Covers the calls the ingestion paths make: ``get_container_client``,
+``list_blobs``, ``get_blob_client`` and ``download_blob().readall()``. Each
+container is a directory under ``root``. Use Azurite instead by passing its
+connection string to the benchmark runner.
+"""
+import os
+import threading
+
+
+class _BlobProperties:
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+
+class _Download:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def readall(self) -> bytes:
+        return self._data
+
+
+class FileSystemBlobClient:
+    def __init__(self, path: str, stats: dict, lock):
+        self._path = path
+        self._stats = stats
+        self._lock = lock
+
+    def download_blob(self):
+        with open(self._path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self._stats["downloads"] = self._stats.get("downloads", 0) + 1
+            self._stats["bytes_read"] = self._stats.get("bytes_read", 0) + len(data)
+        return _Download(data)
+
+    def upload_blob(self, data: bytes, overwrite: bool = False):
+        if os.path.exists(self._path) and not overwrite:
+            raise FileExistsError(self._path)
+        with open(self._path, "wb") as f:
+            f.write(data)
+
+
+class FileSystemContainerClient:
+    def __init__(self, directory: str, stats: dict, lock):
+        self._directory = directory
+        self._stats = stats
+        self._lock = lock
+        os.makedirs(directory, exist_ok=True)
+
+    def list_blobs(self):
+        with self._lock:
+            self._stats["list_blobs"] = self._stats.get("list_blobs", 0) + 1
+        for name in sorted(os.listdir(self._directory)):
+            yield _BlobProperties(name, os.path.getsize(os.path.join(self._directory, name)))
+
+    def get_blob_client(self, blob_name: str) -> FileSystemBlobClient:
+        return FileSystemBlobClient(os.path.join(self._directory, blob_name), self._stats, self._lock)
+
+
+class FileSystemBlobServiceClient:
+    def __init__(self, root: str):
+        self.root = root
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def get_container_client(self, container_name: str) -> FileSystemContainerClient:
+        return FileSystemContainerClient(os.path.join(self.root, container_name), self.stats, self._lock)
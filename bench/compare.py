@@ -0,0 +1,68 @@
+"""Compare two benchmark reports and flag regressions.
+
+    python -m bench.compare bench_results/abc123.json bench_results/def456.json --threshold 0.1
+
+Exits with status 1 when any shared scenario regresses by more than the
+threshold: higher p95/p99 latency, lower QPS, or more upstream calls.
+"""
+import argparse
+import json
+import sys
+
+# (label, path into the scenario summary, True if higher is worse)
+METRICS = [
+    ("p50 ms", ("latency_ms", "p50"), True),
+    ("p95 ms", ("latency_ms", "p95"), True),
+    ("p99 ms", ("latency_ms", "p99"), True),
+    ("qps", ("qps",), False),
+    ("upstream calls", ("upstream", "calls"), True),
+    ("errors", ("errors",), True),
+]
+GATED = {"p95 ms", "p99 ms", "qps", "upstream calls", "errors"}
+
+
+def metric(summary: dict, path: tuple) -> float:
+    value = summary
+    for key in path:
+        value = value.get(key, 0) if isinstance(value, dict) else 0
+    return sum(value.values()) if isinstance(value, dict) else float(value or 0)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    regressions = []
+    for name in sorted(set(baseline["scenarios"]) & set(candidate["scenarios"])):
+        print(f"\n{name}")
+        for label, path, higher_is_worse in METRICS:
+            before = metric(baseline["scenarios"][name], path)
+            after = metric(candidate["scenarios"][name], path)
+            change = (after - before) / before if before else (1.0 if after else 0.0)
+            worse = change > threshold if higher_is_worse else change < -threshold
+            flag = "  REGRESSION" if worse and label in GATED else ""
+            print(f"  {label:<15} {before:>10.2f} -> {after:>10.2f}  ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((name, label, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two bench.run_bench reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative change, 0.1 = 10%%")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"baseline {baseline['meta']['commit']}  candidate {candidate['meta']['commit']}")
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+    print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Deterministic synthetic documents, queries and embeddings for the benchmark."""
+import math
+import random
+import re
+import zlib
+
+EMBEDDING_DIMENSIONS = 1536
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "da", "fe", "gu", "ho", "ji", "pa", "qu"]
+_TOKEN = re.compile(r"\w+")
+
+
+def vocabulary(size: int = 800, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def documents(count: int, words_per_doc: int = 900, seed: int = 11) -> dict:
+    """Return {blob_name: text}; Zipf-ish word choice so some terms are common."""
+    rng = random.Random(seed)
+    vocab = vocabulary()
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    docs = {}
+    for i in range(count):
+        # Each document leans on its own slice of the vocabulary
+        offset = rng.randrange(len(vocab))
+        topic = vocab[offset:] + vocab[:offset]
+        words = rng.choices(topic, weights=weights, k=words_per_doc)
+        docs[f"doc_{i:04d}.pdf"] = " ".join(words)
+    return docs
+
+
+def labelled_queries(docs: dict, count: int, seed: int = 13) -> list:
+    """(query, blob_name) pairs; each query is sampled from the named document."""
+    rng = random.Random(seed)
+    items = list(docs.items())
+    result = []
+    for _ in range(count):
+        blob_name, text = rng.choice(items)
+        words = text.split()
+        start = rng.randrange(max(1, len(words) - 6))
+        result.append((" ".join(words[start:start + rng.randint(3, 6)]), blob_name))
+    return result
+
+
+def queries(docs: dict, count: int, seed: int = 13) -> list:
+    """Short queries sampled from document text so most have real matches."""
+    return [query for query, _ in labelled_queries(docs, count, seed)]
+
+
+def embed(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """Hashed bag-of-words vector, L2-normalised, so cosine tracks term overlap."""
+    vector = [0.0] * dimensions
+    for token in _TOKEN.findall(text.lower()):
+        h = zlib.crc32(token.encode())
+        vector[h % dimensions] += 1.0 if h & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def tokens(text: str) -> set:
+    return set(_TOKEN.findall(text.lower()))
+
+
+def make_pdf(text: str, line_chars: int = 90, lines_per_page: int = 60) -> bytes:
+    """Build a minimal multi-page PDF whose extracted text is ``text``."""
+    words, lines, line = text.split(), [], ""
+    for word in words:
+        if len(line) + len(word) + 1 > line_chars:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 780 Td " + " ".join(f"({l}) '" for l in page_lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
@@ -0,0 +1,591 @@
+"""Drive the query and ingestion paths against local stubs and record a JSON report.
+
+    python -m bench.run_bench --scenarios backend_query,function_query --requests 300 --concurrency 16
+
+Scenarios:
+
+- ``backend_query``   POST /query on ``backend_api.app`` (in-process ASGI, one event loop)
+- ``function_query``  the ``function_app`` /query handler, called from a thread pool
+- ``function_reindex`` the ``function_app`` /reindex handler with BlobCreated events
+- ``ingest``          ``process_documents.process_blob`` over the whole container
+- ``chat_stream``     streamed chat completions, reporting time to first token
+- ``rerank``          CPU cost of ``rag_core.rerank`` per query, and how often the
+                      query's source document makes the final top 3 with rerank
+                      off and at several candidate counts (no network)
+
+Search and OpenAI are served by ``bench.stub_server`` in a child process; blobs
+come from a filesystem stand-in, or from Azurite with ``--azurite``. Use
+``python -m bench.compare`` to diff two reports.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import ROOT_DIR, corpus, stub_server
+from bench.blob_stub import FileSystemBlobServiceClient
+
+# Candidate counts the rerank scenario scores besides plain top-3 and RERANK_CANDIDATES
+RERANK_SWEEP = (10, 20, 30)
+ALL_SCENARIOS = ["backend_query", "function_query", "function_reindex", "ingest", "chat_stream", "rerank"]
+CONTAINER_NAME = "documents"
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def payload_summary(samples: list) -> dict:
+    """samples: (wire_bytes, raw_bytes, Server-Timing durations) per successful response"""
+    if not samples:
+        return {}
+    wire, raw, timings = zip(*samples)
+    summary = {
+        "payload_bytes": {
+            "wire_mean": round(sum(wire) / len(wire), 1),
+            "raw_mean": round(sum(raw) / len(raw), 1),
+            "wire_p95": percentile(list(wire), 95),
+        },
+    }
+    for step in ("serialize", "compress"):
+        durations = [t.get(step, 0.0) for t in timings]
+        summary[f"{step}_ms"] = {
+            "p50": round(percentile(durations, 50), 3),
+            "p95": round(percentile(durations, 95), 3),
+            "p99": round(percentile(durations, 99), 3),
+        }
+    return summary
+
+
+def reset_hot_set(module):
+    hot_set = getattr(module, "hot_set", None)
+    if hot_set is not None:
+        hot_set.reset_metrics()
+
+
+def hot_set_summary(module) -> dict:
+    hot_set = getattr(module, "hot_set", None)
+    return {"hot_set": hot_set.metrics()} if hot_set is not None else {}
+
+
+def server_timing(headers) -> dict:
+    """{metric: dur_ms} from a Server-Timing header"""
+    timings = {}
+    for part in (headers.get("Server-Timing") or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.startswith("dur="):
+            timings[name] = float(params[4:])
+    return timings
+
+
+def decode_body(body: bytes, encoding) -> bytes:
+    if encoding == "gzip":
+        import gzip
+        return gzip.decompress(body)
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+def summarize(latencies_s: list, errors: int, duration_s: float) -> dict:
+    latencies_ms = [l * 1000 for l in latencies_s]
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "duration_s": round(duration_s, 3),
+        "qps": round(len(latencies_ms) / duration_s, 2) if duration_s else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 2),
+            "p95": round(percentile(latencies_ms, 95), 2),
+            "p99": round(percentile(latencies_ms, 99), 2),
+            "mean": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+            "max": round(max(latencies_ms, default=0.0), 2),
+        },
+    }
+
+
+def rss_bytes():
+    """Current resident set size, or None where it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemorySampler:
+    """Samples RSS in the background so each scenario gets its own peak"""
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.start_bytes = rss_bytes()
+        self.peak_bytes = self.start_bytes
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        if self.start_bytes is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._update()
+
+    def _update(self):
+        current = rss_bytes()
+        if current is not None and self.peak_bytes is not None:
+            self.peak_bytes = max(self.peak_bytes, current)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_s):
+            self._update()
+
+    def summary(self) -> dict:
+        if self.start_bytes is None:
+            return {"rss_start_mb": None, "rss_peak_mb": None, "rss_growth_mb": None}
+        return {
+            "rss_start_mb": round(self.start_bytes / 2**20, 1),
+            "rss_peak_mb": round(self.peak_bytes / 2**20, 1),
+            "rss_growth_mb": round((self.peak_bytes - self.start_bytes) / 2**20, 1),
+        }
+
+
+# ─── Stub process ─────────────────────────────────────────────────
+
+class StubProcess:
+    def __init__(self, stub_args: list):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "bench.stub_server", "--port", "0", *stub_args],
+            cwd=ROOT_DIR,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        line = self.process.stdout.readline()
+        if not line.startswith("stub listening on "):
+            self.process.kill()
+            raise RuntimeError(f"Stub server failed to start: {line!r}")
+        self.url = line.split()[-1]
+
+    def _call(self, method: str, path: str) -> dict:
+        request = urllib.request.Request(self.url + path, method=method, data=b"" if method == "POST" else None)
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def reset(self):
+        self._call("POST", "/_reset")
+
+    def stats(self) -> dict:
+        return self._call("GET", "/_stats")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+# ─── Scenario drivers ─────────────────────────────────────────────
+
+def run_threaded(work, items: list, concurrency: int):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def timed(item):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = work(item)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, items))
+    return latencies, errors, time.perf_counter() - start
+
+
+def function_handler(name: str):
+    import function_app
+
+    handler = getattr(function_app, name)
+    # The v2 programming model wraps handlers in a FunctionBuilder
+    return handler.build().get_user_function() if hasattr(handler, "build") else handler
+
+
+def backend_query(args, queries: list):
+    import httpx
+
+    sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+    import backend_api
+
+    payloads = []
+
+    async def drive(batch: list):
+        latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def one(q):
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(
+                        "/query", json={"query": q}, headers={"Accept-Encoding": args.accept_encoding}
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        errors += 1
+                        return
+                    wire = int(response.headers.get("content-length") or len(response.content))
+                    payloads.append((wire, len(response.content), server_timing(response.headers)))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(q) for q in batch))
+            return latencies, errors, time.perf_counter() - start
+
+    asyncio.run(drive(queries[:args.warmup]))
+
+    def run():
+        payloads.clear()
+        reset_hot_set(backend_api)
+        return (*asyncio.run(drive(queries[args.warmup:])), payload_summary(payloads), hot_set_summary(backend_api))
+
+    return run
+
+
+def function_query(args, queries: list):
+    import azure.functions as func
+
+    handler = function_handler("query")
+    payloads = []
+
+    def work(q):
+        request = func.HttpRequest(
+            method="POST",
+            url="/api/query",
+            headers={"Content-Type": "application/json", "Accept-Encoding": args.accept_encoding},
+            body=json.dumps({"query": q}).encode(),
+        )
+        response = handler(request)
+        if response.status_code != 200:
+            return False
+        body = response.get_body()
+        raw = decode_body(body, response.headers.get("Content-Encoding"))
+        payloads.append((len(body), len(raw), server_timing(response.headers)))
+        return True
+
+    run_threaded(work, queries[:args.warmup], args.concurrency)
+
+    def run():
+        import function_app
+
+        payloads.clear()
+        reset_hot_set(function_app)
+        return (*run_threaded(work, queries[args.warmup:], args.concurrency), payload_summary(payloads),
+                hot_set_summary(function_app))
+
+    return run
+
+
+def function_reindex(args, blob_names: list, blob_service):
+    import azure.functions as func
+    import function_app
+
+    function_app.get_blob_service_client = lambda: blob_service
+    handler = function_handler("reindex")
+
+    def work(blob_name):
+        event = {
+            "eventType": "Microsoft.Storage.BlobCreated",
+            "data": {"url": f"https://bench.blob.core.windows.net/{CONTAINER_NAME}/{blob_name}"},
+        }
+        request = func.HttpRequest(
+            method="POST",
+            url="/api/reindex",
+            headers={"Content-Type": "application/json"},
+            body=json.dumps([event]).encode(),
+        )
+        return handler(request).status_code == 200
+
+    return lambda: run_threaded(work, blob_names, args.concurrency)
+
+
+def ingest(args, blob_names: list, blob_service):
+    sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+    import process_documents
+
+    if blob_service is not None:
+        process_documents.blob_service = blob_service
+
+    def work(blob_name):
+        process_documents.process_blob(blob_name, CONTAINER_NAME)
+        return True
+
+    def run():
+        # process_blob prints progress for every blob
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return run_threaded(work, blob_names, args.concurrency)
+
+    return run
+
+
+def chat_stream(args, queries: list):
+    from rag_core import get_openai_client
+    from rag_core.pipeline import CHAT_MODEL
+
+    openai_client = get_openai_client()
+    first_token = []
+    lock = threading.Lock()
+
+    def work(q):
+        start = time.perf_counter()
+        stream = openai_client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": q}],
+            stream=True,
+        )
+        seen = False
+        for chunk in stream:
+            if not seen and chunk.choices and chunk.choices[0].delta.content:
+                seen = True
+                with lock:
+                    first_token.append(time.perf_counter() - start)
+        return seen
+
+    def run():
+        first_token.clear()
+        result = run_threaded(work, queries[args.warmup:], args.concurrency)
+        ttft_ms = [t * 1000 for t in first_token]
+        extra = {"ttft_ms": {
+            "p50": round(percentile(ttft_ms, 50), 2),
+            "p95": round(percentile(ttft_ms, 95), 2),
+            "p99": round(percentile(ttft_ms, 99), 2),
+        }}
+        return (*result, extra)
+
+    return run
+
+
+def rerank(args, queries: list):
+    from rag_core import candidates_from_env, rerank as rerank_candidates
+
+    top_k = 3
+    count = candidates_from_env()
+    # Plain top_k (rerank off) against a few over-fetch sizes
+    sweep = sorted({top_k, count, *RERANK_SWEEP})
+    index = list(stub_server.seeded_documents(args.seed_docs).values())
+    labelled = corpus.labelled_queries(corpus.documents(args.seed_docs), len(queries))
+    # Candidate lists from the stub's hybrid search; each query's source document is the right answer
+    workload = []
+    for query, source in labelled[args.warmup:]:
+        query_vector = corpus.embed(query)
+        hits = stub_server.search(index, {
+            "search": query,
+            "vectorQueries": [{"kind": "vector", "vector": query_vector, "k": max(sweep), "fields": "contentVector"}],
+            "select": "id,content,metadata_storage_name,contentVector",
+            "top": max(sweep),
+        })
+        workload.append((query_vector, source, hits))
+
+    def source_hit_rate(candidates: int) -> float:
+        found = 0
+        for query_vector, source, hits in workload:
+            docs = rerank_candidates(query_vector, hits[:candidates], top_k) if candidates > top_k else hits[:top_k]
+            found += any(doc.get("metadata_storage_name") == source for doc in docs)
+        return round(found / len(workload), 4) if workload else 0.0
+
+    def run():
+        latencies, cpu = [], []
+        start = time.perf_counter()
+        for query_vector, _, hits in workload:
+            wall, used = time.perf_counter(), time.process_time()
+            rerank_candidates(query_vector, hits[:count], top_k)
+            cpu.append((time.process_time() - used) * 1e6)
+            latencies.append(time.perf_counter() - wall)
+        elapsed = time.perf_counter() - start
+        extra = {"cpu_us": {
+            "p50": round(percentile(cpu, 50), 1),
+            "p95": round(percentile(cpu, 95), 1),
+            "p99": round(percentile(cpu, 99), 1),
+        }, "candidates": count, "source_hit_rate": {str(n): source_hit_rate(n) for n in sweep}}
+        return latencies, 0, elapsed, extra
+
+    return run
+
+
+# ─── Main ─────────────────────────────────────────────────────────
+
+def prepare_blobs(args, workdir: str):
+    """Write synthetic PDFs to the filesystem stand-in or Azurite."""
+    docs = corpus.documents(args.ingest_docs, seed=29)
+    if args.azurite:
+        from azure.storage.blob import BlobServiceClient
+
+        blob_service = BlobServiceClient.from_connection_string(args.azurite)
+        container = blob_service.get_container_client(CONTAINER_NAME)
+        if not container.exists():
+            container.create_container()
+    else:
+        blob_service = FileSystemBlobServiceClient(workdir)
+        container = blob_service.get_container_client(CONTAINER_NAME)
+    for name, text in docs.items():
+        container.get_blob_client(name).upload_blob(corpus.make_pdf(text), overwrite=True)
+    return sorted(docs), blob_service
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline RAG benchmark")
+    parser.add_argument("--scenarios", default=",".join(ALL_SCENARIOS[:4]), help=f"Comma-separated subset of {ALL_SCENARIOS}")
+    parser.add_argument("--requests", type=int, default=200, help="Measured queries per query scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured queries before each query scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed-docs", type=int, default=100, help="Synthetic documents pre-indexed in the search stub")
+    parser.add_argument("--ingest-docs", type=int, default=20, help="PDFs written to blob storage for reindex/ingest")
+    parser.add_argument("--query-pool", type=int, default=0, help="Draw queries from this many distinct ones, Zipf-weighted (0 = all distinct)")
+    parser.add_argument("--hotset-capacity", type=int, help="HOTSET_CAPACITY for the apps under test (0 disables)")
+    parser.add_argument("--hotset-threshold", type=float, help="HOTSET_THRESHOLD; stub embeddings need a much lower value than ada-002")
+    parser.add_argument("--hotset-refresh-seconds", type=float, help="HOTSET_REFRESH_SECONDS")
+    parser.add_argument("--accept-encoding", default="br, gzip", help="Accept-Encoding sent on /query ('' for none)")
+    parser.add_argument("--rerank-candidates", type=int, help="RERANK_CANDIDATES for the apps under test, also used by the rerank scenario")
+    parser.add_argument("--azurite", metavar="CONNECTION_STRING", help="Use Azurite instead of the filesystem blob stand-in")
+    parser.add_argument("--trace-memory", action="store_true", help="Also record tracemalloc peaks of Python allocations (slows the run)")
+    parser.add_argument("--output", help="Report path (default: bench_results/<commit>.json)")
+    stub = parser.add_argument_group("stub latency and throttling")
+    for option in ("--embed-latency-ms", "--chat-latency-ms", "--search-latency-ms", "--stream-token-ms",
+                   "--answer-tokens", "--jitter", "--throttle-rate", "--retry-after-ms"):
+        action = next(a for a in stub_server.build_parser()._actions if option in a.option_strings)
+        stub.add_argument(option, type=action.type, default=action.default, help=action.help)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(ALL_SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {sorted(unknown)}")
+
+    stub_args = ["--seed-docs", str(args.seed_docs)]
+    for option in ("embed_latency_ms", "chat_latency_ms", "search_latency_ms", "stream_token_ms",
+                   "answer_tokens", "jitter", "throttle_rate", "retry_after_ms"):
+        stub_args += ["--" + option.replace("_", "-"), str(getattr(args, option))]
+    stub = StubProcess(stub_args)
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+
+    os.environ.update({
+        "SEARCH_ENDPOINT": stub.url,
+        "SEARCH_ADMIN_KEY": "bench",
+        "OPENAI_ENDPOINT": stub.url,
+        "OPENAI_API_KEY": "bench",
+        "CONTAINER_NAME": CONTAINER_NAME,
+        "STORAGE_ACCOUNT_NAME": "bench",
+        "STORAGE_CONNECTION_STRING": args.azurite or "UseDevelopmentStorage=true",
+    })
+    for option in ("rerank_candidates", "hotset_capacity", "hotset_threshold", "hotset_refresh_seconds"):
+        if getattr(args, option) is not None:
+            os.environ[option.upper()] = str(getattr(args, option))
+
+    queries = corpus.queries(corpus.documents(args.seed_docs), args.requests + args.warmup)
+    if args.query_pool:
+        # Repeat a small pool with Zipf-like popularity, the way real traffic hits hot documents
+        pool = queries[:args.query_pool]
+        queries = random.Random(19).choices(pool, weights=[1 / (r + 1) for r in range(len(pool))], k=len(queries))
+    results = {}
+    try:
+        blob_names, blob_service = [], None
+        if {"function_reindex", "ingest"} & set(scenarios):
+            blob_names, blob_service = prepare_blobs(args, workdir)
+
+        for name in scenarios:
+            print(f"running {name}...", flush=True)
+            if name == "function_reindex":
+                run = function_reindex(args, blob_names, blob_service)
+            elif name == "ingest":
+                run = ingest(args, blob_names, None if args.azurite else blob_service)
+            else:
+                run = globals()[name](args, queries)
+
+            stub.reset()
+            if args.trace_memory:
+                tracemalloc.start()
+            with MemorySampler() as memory:
+                latencies, errors, duration, *extra = run()
+            summary = summarize(latencies, errors, duration)
+            for more in extra:
+                summary.update(more)
+            summary["concurrency"] = args.concurrency
+            summary["upstream"] = stub.stats()
+            if isinstance(blob_service, FileSystemBlobServiceClient) and name in ("function_reindex", "ingest"):
+                summary["upstream"]["blob"] = dict(blob_service.stats)
+                blob_service.stats.clear()
+            summary["memory"] = memory.summary()
+            if args.trace_memory:
+                summary["memory"]["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+                tracemalloc.stop()
+            results[name] = summary
+            latency = summary["latency_ms"]
+            print(f"  {summary['qps']} qps  p50 {latency['p50']} ms  p95 {latency['p95']} ms  "
+                  f"p99 {latency['p99']} ms  errors {errors}", flush=True)
+    finally:
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(ROOT_DIR, "bench_results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Local stand-in for the Azure AI Search REST API and Azure OpenAI.
+
+Runs in its own process so stub CPU never shows up in the measured process:
+
+    python -m bench.stub_server --port 8765 --seed-docs 200 --chat-latency-ms 400
+
+Point SEARCH_ENDPOINT and OPENAI_ENDPOINT at ``http://127.0.0.1:<port>`` and the
+real SDK clients talk to it. Implemented routes:
+
+- ``POST /indexes('<name>')/docs/search.post.search`` (hybrid search, select, top,
+  highlight, simple ``eq`` / ``search.in`` filters)
+- ``POST /indexes('<name>')/docs/search.index`` (upload / merge / delete)
+- ``POST /openai/deployments/<model>/embeddings``
+- ``POST /openai/deployments/<model>/chat/completions`` (optionally streamed)
+- ``GET /_stats`` and ``POST /_reset`` for the benchmark runner
+
+A configurable fraction of upstream calls is answered with 429 + retry-after so
+SDK retry behaviour is part of the measurement.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench import corpus
+from rag_core import chunk_text, make_safe_id
+
+_SEARCH_PATH = re.compile(r"^/indexes(?:\('([^']+)'\)|/([^/]+))/docs/(search\.post\.search|search\.index)")
+_OPENAI_PATH = re.compile(r"^/openai/deployments/([^/]+)/(embeddings|chat/completions)")
+_EQ_FILTER = re.compile(r"^(\w+) eq '((?:[^']|'')*)'$")
+_IN_FILTER = re.compile(r"^search\.in\((\w+),\s*'([^']*)'(?:,\s*'([^']*)')?\)$")
+
+
+class StubState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.rng = random.Random(args.seed)
+        self.indexes = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls = {}
+            self.throttled = {}
+            self.bytes_out = 0
+
+    def count(self, route: str):
+        with self.lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    def should_throttle(self, route: str) -> bool:
+        with self.lock:
+            throttle = self.rng.random() < self.args.throttle_rate
+            if throttle:
+                self.throttled[route] = self.throttled.get(route, 0) + 1
+            return throttle
+
+    def index(self, name: str) -> dict:
+        with self.lock:
+            return self.indexes.setdefault(name, {})
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "throttled": dict(self.throttled),
+                "bytes_out": self.bytes_out,
+                "documents": {name: len(docs) for name, docs in self.indexes.items()},
+            }
+
+
+def _sleep_ms(ms: float, jitter: float):
+    if ms > 0:
+        time.sleep(max(0.0, ms * (1 + random.uniform(-jitter, jitter))) / 1000)
+
+
+def _matches_filter(doc: dict, expression) -> bool:
+    if not expression:
+        return True
+    match = _EQ_FILTER.match(expression.strip())
+    if match:
+        return doc.get(match.group(1)) == match.group(2).replace("''", "'")
+    match = _IN_FILTER.match(expression.strip())
+    if match:
+        # Like the service, every character of the delimiter string separates values
+        delimiters = match.group(3) or " ,"
+        values = set(re.split(f"[{re.escape(delimiters)}]+", match.group(2))) - {""}
+        return doc.get(match.group(1)) in values
+    raise ValueError(f"Unsupported filter: {expression}")
+
+
+def _dot(sparse_query: list, vector: list) -> float:
+    return sum(weight * vector[i] for i, weight in sparse_query)
+
+
+def _highlights(text: str, query_tokens: set, pre: str, post: str, window: int = 80) -> list:
+    """Up to two fragments around query-term matches, like the service's hit highlighting"""
+    fragments, covered = [], -1
+    for match in re.finditer(r"\w+", text):
+        if match.group().lower() not in query_tokens or match.start() < covered:
+            continue
+        start, end = max(0, match.start() - window), min(len(text), match.end() + window)
+        fragment = re.sub(
+            r"\w+",
+            lambda m: f"{pre}{m.group()}{post}" if m.group().lower() in query_tokens else m.group(),
+            text[start:end],
+        )
+        fragments.append(fragment)
+        covered = end
+        if len(fragments) == 2:
+            break
+    return fragments
+
+
+def search(docs: list, body: dict) -> list:
+    """Score a snapshot of the index; stored docs are never mutated here"""
+    text = body.get("search") or "*"
+    query_tokens = set() if text == "*" else corpus.tokens(text)
+    vector_queries = body.get("vectorQueries") or []
+    candidates = [d for d in docs if _matches_filter(d, body.get("filter"))]
+
+    scored = []
+    for doc in candidates:
+        score = 0.0
+        if query_tokens:
+            score += len(query_tokens & doc["_tokens"]) / len(query_tokens)
+        for vector_query in vector_queries:
+            sparse = vector_query.setdefault("_sparse", [(i, v) for i, v in enumerate(vector_query["vector"]) if v])
+            if doc.get(vector_query.get("fields", "contentVector")):
+                score += _dot(sparse, doc[vector_query.get("fields", "contentVector")])
+        if text == "*" or score > 0:
+            scored.append((score, doc))
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+    top = body.get("top") or 50
+    skip = body.get("skip") or 0
+    select = [f.strip() for f in body["select"].split(",")] if body.get("select") else None
+    highlight_fields = [f.strip() for f in body["highlight"].split(",")] if body.get("highlight") else []
+    pre, post = body.get("highlightPreTag", "<em>"), body.get("highlightPostTag", "</em>")
+
+    results = []
+    for score, doc in scored[skip:skip + top]:
+        fields = select or [k for k in doc if not k.startswith("_")]
+        hit = {field: doc.get(field) for field in fields}
+        hit["@search.score"] = score
+        highlights = {f: _highlights(doc.get(f) or "", query_tokens, pre, post) for f in highlight_fields}
+        highlights = {f: fragments for f, fragments in highlights.items() if fragments}
+        if highlights:
+            hit["@search.highlights"] = highlights
+        results.append(hit)
+    return results
+
+
+def _stored(doc: dict) -> dict:
+    return {**doc, "_tokens": corpus.tokens(doc.get("content") or "")}
+
+
+def index_documents(docs: dict, body: dict) -> list:
+    """Apply index actions; caller holds state.lock. Docs are replaced, never updated in place"""
+    results = []
+    for action in body.get("value", []):
+        kind = action.pop("@search.action", "upload")
+        key = action["id"]
+        if kind == "delete":
+            docs.pop(key, None)
+        elif kind in ("merge", "mergeOrUpload") and key in docs:
+            docs[key] = _stored({**docs[key], **action})
+        else:
+            docs[key] = _stored(action)
+        results.append({"key": key, "status": True, "errorMessage": None, "statusCode": 200 if kind == "delete" else 201})
+    return results
+
+
+def _usage(text: str) -> dict:
+    n = max(1, len(text) // 4)
+    return {"prompt_tokens": n, "total_tokens": n}
+
+
+def make_handler(state: StubState):
+    args = state.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def _send(self, status: int, payload, headers=None, content_type="application/json"):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+            with state.lock:
+                state.bytes_out += len(body)
+
+        def _throttle(self, route: str) -> bool:
+            if not state.should_throttle(route):
+                return False
+            self._send(
+                429,
+                {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                {"retry-after-ms": str(args.retry_after_ms), "Retry-After": str(max(1, args.retry_after_ms // 1000))},
+            )
+            return True
+
+        def do_GET(self):
+            if self.path.startswith("/_stats"):
+                return self._send(200, state.stats())
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            path = self.path.split("?", 1)[0]
+
+            if path == "/_reset":
+                state.reset_stats()
+                return self._send(200, {"ok": True})
+
+            body = json.loads(raw or b"{}")
+
+            match = _SEARCH_PATH.match(path)
+            if match:
+                index_name = match.group(1) or match.group(2)
+                route = "search" if match.group(3) == "search.post.search" else "index"
+                state.count(route)
+                if self._throttle(route):
+                    return
+                _sleep_ms(args.search_latency_ms, args.jitter)
+                docs = state.index(index_name)
+                if route == "search":
+                    # Snapshot under the lock; concurrent index calls replace entries
+                    with state.lock:
+                        snapshot = list(docs.values())
+                    try:
+                        return self._send(200, {"value": search(snapshot, body)})
+                    except ValueError as e:
+                        return self._send(400, {"error": {"code": "InvalidRequestParameter", "message": str(e)}})
+                with state.lock:
+                    results = index_documents(docs, body)
+                return self._send(200, {"value": results})
+
+            match = _OPENAI_PATH.match(path)
+            if match:
+                route = "embeddings" if match.group(2) == "embeddings" else "chat"
+                state.count(route)
+                if self._throttle(route):
+                    return
+                if route == "embeddings":
+                    return self._embeddings(match.group(1), body)
+                return self._chat(match.group(1), body)
+
+            self._send(404, {"error": f"no stub for {path}"})
+
+        def _embeddings(self, model: str, body: dict):
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            _sleep_ms(args.embed_latency_ms, args.jitter)
+            self._send(200, {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": corpus.embed(text)}
+                    for i, text in enumerate(inputs)
+                ],
+                "model": model,
+                "usage": _usage(" ".join(inputs)),
+            })
+
+        def _chat(self, model: str, body: dict):
+            prompt = " ".join(m.get("content") or "" for m in body.get("messages", []))
+            sources = sorted(set(re.findall(r"\[Source: ([^\]]+)\]", prompt)))
+            answer = "Stub answer based on " + (", ".join(f"[Source: {s}]" for s in sources) or "no sources") + "."
+            answer += " " + " ".join(["lorem"] * args.answer_tokens)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+            if not body.get("stream"):
+                _sleep_ms(args.chat_latency_ms, args.jitter)
+                return self._send(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                    "usage": {**_usage(prompt), "completion_tokens": len(answer.split())},
+                })
+
+            # Server-sent events: first token after the configured latency, then one per token
+            events = []
+            for i, token in enumerate(answer.split(" ")):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token if i == 0 else " " + token}, "finish_reason": None}],
+                }
+                events.append(f"data: {json.dumps(chunk)}\n\n".encode())
+            events.append(b"data: [DONE]\n\n")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(sum(len(e) for e in events)))
+            self.end_headers()
+            _sleep_ms(args.chat_latency_ms, args.jitter)
+            for event in events:
+                self.wfile.write(event)
+                self.wfile.flush()
+                _sleep_ms(args.stream_token_ms, 0)
+            with state.lock:
+                state.bytes_out += sum(len(e) for e in events)
+
+    return Handler
+
+
+def seeded_documents(count: int) -> dict:
+    """Index contents for ``count`` corpus documents, keyed by id"""
+    docs = {}
+    # Same chunking and IDs as real ingestion, without calling the embeddings route
+    for blob_name, text in corpus.documents(count).items():
+        for i, chunk in enumerate(chunk_text(text)):
+            doc_id = make_safe_id(blob_name, i)
+            docs[doc_id] = _stored({
+                "id": doc_id,
+                "content": chunk,
+                "title": blob_name,
+                "metadata_storage_name": blob_name,
+                "contentVector": corpus.embed(chunk),
+            })
+    return docs
+
+
+def seed_index(state: StubState, index_name: str, count: int):
+    state.index(index_name).update(seeded_documents(count))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local Azure Search + Azure OpenAI stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--index-name", default="documents-index")
+    parser.add_argument("--seed-docs", type=int, default=0, help="Synthetic documents to pre-index")
+    parser.add_argument("--embed-latency-ms", type=float, default=30)
+    parser.add_argument("--chat-latency-ms", type=float, default=300)
+    parser.add_argument("--search-latency-ms", type=float, default=40)
+    parser.add_argument("--stream-token-ms", type=float, default=5, help="Delay between streamed chat chunks")
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative latency jitter, 0.1 = +/-10%%")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+def serve(args):
+    state = StubState(args)
+    if args.seed_docs:
+        seed_index(state, args.index_name, args.seed_docs)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"stub listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve(build_parser().parse_args())
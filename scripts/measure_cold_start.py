@@ -0,0 +1,107 @@
+"""Measure cold-start import time of the Function app's query-only path.
+
+Each sample runs in a fresh interpreter so nothing is cached in sys.modules.
+
+    python scripts/measure_cold_start.py --runs 10
+
+"before" replays the module-level imports function_app.py used to do (blob SDK
+and PyPDF2 included) and builds the query clients; "after" imports the current
+function_app and then everything a first /query call loads: the Search
+models, numpy (via rerank) and the response encoders. The report also lists
+any ingestion-only module that leaked onto the query path.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-function")
+
+INGESTION_ONLY_MODULES = ["PyPDF2", "azure.storage.blob"]
+
+BEFORE = """
+import os
+import azure.functions
+from azure.storage.blob import BlobServiceClient
+import PyPDF2
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+from azure.search.documents.models import VectorizedQuery
+from openai import AzureOpenAI
+SearchClient(os.environ["SEARCH_ENDPOINT"], "documents-index", AzureKeyCredential(os.environ["SEARCH_ADMIN_KEY"]))
+AzureOpenAI(api_key=os.environ["OPENAI_API_KEY"], api_version="2024-02-15-preview", azure_endpoint=os.environ["OPENAI_ENDPOINT"])
+"""
+
+AFTER = """
+import function_app
+from rag_core import encode_json, get_openai_client, get_search_client, rerank
+get_search_client()
+get_openai_client()
+from azure.search.documents.models import VectorizedQuery
+rerank([1.0, 0.0], [{"contentVector": [1.0, 0.0], "content": ""}] * 4, 3)
+encode_json({"answer": "", "citations": []}, "br, gzip")
+"""
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<cold-start>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+
+def sample(code: str) -> dict:
+    env = dict(os.environ)
+    # Client factories only need syntactically valid settings, no network
+    env.setdefault("SEARCH_ENDPOINT", "https://example.search.windows.net")
+    env.setdefault("SEARCH_ADMIN_KEY", "placeholder")
+    env.setdefault("OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+    env.setdefault("OPENAI_API_KEY", "placeholder")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code, modules=INGESTION_ONLY_MODULES)],
+        cwd=FUNCTION_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(code: str, runs: int) -> dict:
+    samples = [sample(code) for _ in range(runs)]
+    timings = [s["ms"] for s in samples]
+    return {
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "ingestion_modules_loaded": samples[-1]["loaded"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Optional path to write the JSON report")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "before": measure(BEFORE, args.runs),
+        "after": measure(AFTER, args.runs),
+    }
+    report["saved_ms"] = round(report["before"]["median_ms"] - report["after"]["median_ms"], 1)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()